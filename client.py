@@ -4,20 +4,52 @@ Simple client for the multi-threaded proxy server.
 Usage:
     python client.py <proxy_host> <proxy_port> <url>
 
-The client sends the URL followed by newline, reads the 10-byte length header,
-the 100-byte content-type header, then reads the body and saves it into a file.
+The client sends a 0x02 protocol-version byte and the URL followed by newline, reads the
+10-byte v2 header (version, 64-bit body length, content-type length) and the content type,
+then streams the body into a file.
 The filename is derived from the URL and content type (defaults to .html).
 """
 
 import socket
+import struct
 import sys
 import os
+import functools
+import time
 import urllib.parse
-from datetime import datetime
 
-LENGTH_HEADER = 10
-CTYPE_HEADER = 100
+PROTO_V2 = 2
+V2_HEADER = struct.Struct('!BQB')   # version, 64-bit body length, content-type length
 RECV_BUFSIZE = 4096
+COPY_BUFSIZE = 65536     # chunk size when streaming the body to disk
+
+# (substring, extension) pairs checked in order; more specific types before the generic "text"
+_CTYPE_EXTS = (
+    ("html", ".html"),
+    ("json", ".json"),
+    ("xml", ".xml"),
+    ("javascript", ".js"),
+    ("plain", ".txt"),
+    ("text", ".html"),
+)
+
+@functools.lru_cache(maxsize=1024)
+def _ext_for(ctype_lower):
+    for needle, ext in _CTYPE_EXTS:
+        if needle in ctype_lower:
+            return ext
+    return ".bin"
+
+class _FilenameChars(dict):
+    # str.translate table: keep alphanumerics and "._-", drop everything else;
+    # each code point is classified once and then served from the dict
+    def __missing__(self, code):
+        ch = chr(code)
+        keep = code if ch.isalnum() or ch in "._-" else None
+        self[code] = keep
+        return keep
+
+_FILENAME_CHARS = _FilenameChars()
 
 def safe_filename_from_url(url, ctype):
     parsed = urllib.parse.urlparse(url)
@@ -32,62 +64,100 @@ def safe_filename_from_url(url, ctype):
     if parsed.query:
         base += "_" + str(abs(hash(parsed.query)))[:8]
     # choose extension from content-type
-    ext = ".html" if "html" in ctype.lower() or "text" in ctype.lower() else ""
-    if not ext:
-        # try to infer from ctype (e.g., text/plain -> .txt)
-        if "plain" in ctype.lower():
-            ext = ".txt"
-        elif "json" in ctype.lower():
-            ext = ".json"
-        elif "xml" in ctype.lower():
-            ext = ".xml"
-        elif "javascript" in ctype.lower():
-            ext = ".js"
-        else:
-            ext = ".bin"
-    # timestamp to avoid collisions
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{base}_{ts}{ext}"
+    ext = _ext_for(ctype.lower())
+    # nanosecond timestamp (hex) to avoid collisions
+    filename = f"{base}_{time.time_ns():x}{ext}"
     # sanitize filename
-    filename = "".join(c for c in filename if c.isalnum() or c in "._-")
-    return filename
-
-def recv_all(sock, n):
-    data = b''
-    while len(data) < n:
-        chunk = sock.recv(min(n - len(data), RECV_BUFSIZE))
-        if not chunk:
-            break
-        data += chunk
-    return data
+    return filename.translate(_FILENAME_CHARS)
+
+def recv_all(rfile, n):
+    # fill a preallocated buffer in place instead of concatenating chunks
+    buf = bytearray(n)
+    off = 0
+    with memoryview(buf) as mv:
+        while off < n:
+            got = rfile.readinto(mv[off:])
+            if not got:
+                break
+            off += got
+    del buf[off:]
+    return buf
+
+def read_headers(rfile):
+    header = recv_all(rfile, V2_HEADER.size)
+    if len(header) < V2_HEADER.size:
+        raise RuntimeError("Incomplete header received")
+    version, body_len, ctype_len = V2_HEADER.unpack(header)
+    if version != PROTO_V2:
+        raise RuntimeError(f"Unsupported protocol version {version} (proxy too old?)")
+
+    # read content-type
+    ctype_raw = recv_all(rfile, ctype_len)
+    if len(ctype_raw) < ctype_len:
+        raise RuntimeError("Incomplete content-type header received")
+    ctype = ctype_raw.decode('utf-8', errors='replace')
+    return body_len, ctype
+
+def copy_body(rfile, f, n):
+    # stream n bytes from rfile to f through one reusable buffer; returns bytes copied
+    buf = bytearray(min(n, COPY_BUFSIZE))
+    remaining = n
+    with memoryview(buf) as mv:
+        while remaining:
+            got = rfile.readinto(mv[:min(remaining, len(buf))])
+            if not got:
+                break
+            f.write(mv[:got])
+            remaining -= got
+    return n - remaining
+
+def open_proxy_connection(proxy_host, proxy_port, url):
+    s = socket.create_connection((proxy_host, proxy_port), timeout=30)
+    try:
+        if hasattr(socket, 'SO_RCVLOWAT'):
+            # don't wake up until at least the fixed header has arrived
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVLOWAT, V2_HEADER.size)
+        # send version byte, then URL followed by newline
+        s.sendall(bytes((PROTO_V2,)) + (url + '\n').encode('utf-8'))
+    except BaseException:
+        s.close()
+        raise
+    return s
 
 def fetch_via_proxy(proxy_host, proxy_port, url):
-    with socket.create_connection((proxy_host, proxy_port), timeout=30) as s:
-        # send URL followed by newline
-        s.sendall((url + '\n').encode('utf-8'))
-
-        # read length header
-        length_header = recv_all(s, LENGTH_HEADER)
-        if len(length_header) < LENGTH_HEADER:
-            raise RuntimeError("Incomplete length header received")
-        try:
-            body_len = int(length_header.decode('ascii'))
-        except Exception as e:
-            raise RuntimeError("Invalid length header") from e
-
-        # read content-type header
-        ctype_raw = recv_all(s, CTYPE_HEADER)
-        if len(ctype_raw) < CTYPE_HEADER:
-            raise RuntimeError("Incomplete content-type header received")
-        ctype = ctype_raw.rstrip(b' ').decode('utf-8', errors='replace')
-
-        # read body
-        body = recv_all(s, body_len)
-        if len(body) < body_len:
-            raise RuntimeError(f"Expected {body_len} bytes, got {len(body)} bytes")
+    with open_proxy_connection(proxy_host, proxy_port, url) as s:
+        # buffered reader: header and body reads are served from one C-level buffer
+        with s.makefile('rb', buffering=RECV_BUFSIZE) as rfile:
+            body_len, ctype = read_headers(rfile)
+
+            # read body
+            body = recv_all(rfile, body_len)
+            if len(body) < body_len:
+                raise RuntimeError(f"Expected {body_len} bytes, got {len(body)} bytes")
 
         return body, ctype
 
+def save_via_proxy(proxy_host, proxy_port, url):
+    # like fetch_via_proxy, but streams the body straight into a file named after
+    # the URL and content type; returns (filename, body_len, ctype)
+    with open_proxy_connection(proxy_host, proxy_port, url) as s:
+        with s.makefile('rb', buffering=RECV_BUFSIZE) as rfile:
+            body_len, ctype = read_headers(rfile)
+
+            filename = safe_filename_from_url(url, ctype)
+            f = open(filename, 'wb')
+            try:
+                with f:
+                    got = copy_body(rfile, f, body_len)
+                if got < body_len:
+                    raise RuntimeError(f"Expected {body_len} bytes, got {got} bytes")
+            except BaseException:
+                # never leave a truncated file behind (short read, socket error, Ctrl-C)
+                os.remove(filename)
+                raise
+
+        return filename, body_len, ctype
+
 def main():
     if len(sys.argv) < 4:
         print("Usage: python client.py <proxy_host> <proxy_port> <url>")
@@ -97,15 +167,12 @@ def main():
     proxy_port = int(sys.argv[2])
     url = sys.argv[3]
     try:
-        body, ctype = fetch_via_proxy(proxy_host, proxy_port, url)
+        filename, body_len, ctype = save_via_proxy(proxy_host, proxy_port, url)
     except Exception as e:
         print("Error:", e)
         sys.exit(2)
 
-    filename = safe_filename_from_url(url, ctype)
-    with open(filename, 'wb') as f:
-        f.write(body)
-    print(f"Saved {len(body)} bytes to {filename} (Content-Type: {ctype})")
+    print(f"Saved {body_len} bytes to {filename} (Content-Type: {ctype})")
 
 if __name__ == '__main__':
     main()
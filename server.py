@@ -3,95 +3,477 @@
 Multi-threaded proxy server.
 Protocol (simple):
 - Client sends a URL as a UTF-8 string terminated by newline ("\n").
-- Server responds with a fixed 10-byte ASCII decimal length header (body length in bytes, zero-padded),
-  followed by a fixed 100-byte ASCII Content-Type header (padded with spaces),
+  A v2 client prefixes the line with a single 0x02 version byte.
+- v1 (no prefix): server responds with a fixed 10-byte ASCII decimal length header (body length in
+  bytes, zero-padded), followed by a fixed 100-byte ASCII Content-Type header (padded with spaces),
   then the raw response body bytes (length matches the 10-byte header).
+- v2: server responds with a 10-byte header struct "!BQB" (version 0x02, 64-bit body length, Content-Type
+  length), the Content-Type bytes (at most 255), then the raw response body bytes.
 If an error occurs while fetching, server returns a nonzero length and a short text error message
 as the body (Content-Type: text/plain; charset=utf-8).
 """
 
+import contextlib
+import email.utils
+import errno
+import http.client
+import io
+import os
+import select
+import shutil
 import socket
+import struct
+import tempfile
 import threading
+import time
+import urllib.parse
 import urllib.request
 import urllib.error
 import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 HOST = '0.0.0.0'
 PORT = 8888            # change if needed
 LENGTH_HEADER = 10     # bytes for length
 CTYPE_HEADER = 100     # bytes for content-type header
+PROTO_V1 = 1           # legacy fixed-width ASCII headers
+PROTO_V2 = 2           # request line prefix byte for the binary framing
+V2_HEADER = struct.Struct('!BQB')   # version, 64-bit body length, content-type length
+_len_fmt = ('%%0%dd' % LENGTH_HEADER).__mod__   # v1 zero-padded decimal length, e.g. "%010d"
 RECV_BUFSIZE = 4096
+MAX_URL_LINE = 8192    # longest request line we read
+CONN_TIMEOUT = 30      # per-operation timeout on client sockets
+REQUEST_TIMEOUT = 10   # overall deadline for receiving the request line
+COPY_BUFSIZE = 65536   # upstream read size when spooling
+SPOOL_MAX = 1 << 20    # bodies above this go to a temp file and are sent with sendfile
+ZEROCOPY_MIN = 10 * 1024   # in-memory bodies at least this big are sent with MSG_ZEROCOPY (Linux)
+MAX_WORKERS = int(os.environ.get('PROXY_WORKERS', 64))   # cap on concurrent client handlers
+CACHE_MAX = 512        # max cached responses (only bodies up to SPOOL_MAX are cached)
+CACHE_MAX_BYTES = 32 << 20   # total body bytes the cache may hold; least recently used is evicted first
+POOL_MAXSIZE = 32      # idle keep-alive upstream connections kept per origin
+POOL_MAX_ORIGINS = 64  # origins with idle connections; least recently used is closed first
+POOL_IDLE_TIMEOUT = 5  # seconds an idle upstream connection may sit before we drop it
+MAX_REDIRECTS = 10     # same limit as urllib's redirect handler
+USER_AGENT = 'MiniProxy/1.0'
+REDIRECT_CODES = (301, 302, 303, 307, 308)
 
+# zerocopy send support; the socket module doesn't export these, values from linux/socket.h and errqueue.h
+SO_ZEROCOPY = getattr(socket, 'SO_ZEROCOPY', 60)
+MSG_ZEROCOPY = getattr(socket, 'MSG_ZEROCOPY', 0x4000000)
+SO_EE_ORIGIN_ZEROCOPY = 5
+SOCK_EXTENDED_ERR = struct.Struct('=IBBBBII')  # errno, origin, type, code, pad, info, data
+_zerocopy_ok = sys.platform.startswith('linux')
+
+# url -> (body, ctype, expires_at); most recently used last
+_cache = OrderedDict()
+_cache_bytes = 0   # sum of cached body lengths, guarded by _cache_lock
+_cache_lock = threading.Lock()
+
+def response_age(resp):
+    # seconds the response already spent in upstream caches (Age header), clamped at 0
+    try:
+        return max(int(resp.getheader('Age') or 0), 0)
+    except ValueError:
+        return 0
+
+def cache_ttl(resp):
+    # seconds the upstream lets us reuse this response for, or None if it must not be cached
+    if resp.status != 200:
+        return None
+    directives = {}
+    for part in (resp.getheader('Cache-Control') or '').lower().split(','):
+        name, _, value = part.strip().partition('=')
+        directives[name] = value.strip('"')
+    if 'no-store' in directives or 'no-cache' in directives or 'private' in directives:
+        return None
+    for name in ('s-maxage', 'max-age'):
+        if name in directives:
+            try:
+                return int(directives[name]) - response_age(resp)
+            except ValueError:
+                return None
+    expires = email.utils.parsedate_tz(resp.getheader('Expires') or '')
+    if expires is None:
+        return None
+    date = email.utils.parsedate_tz(resp.getheader('Date') or '')
+    now = email.utils.mktime_tz(date) if date else time.time()
+    return email.utils.mktime_tz(expires) - now - response_age(resp)
+
+def cache_get(url):
+    global _cache_bytes
+    with _cache_lock:
+        entry = _cache.get(url)
+        if entry is None:
+            return None
+        if entry[2] <= time.monotonic():
+            del _cache[url]
+            _cache_bytes -= len(entry[0])
+            return None
+        _cache.move_to_end(url)
+        return entry
+
+def cache_put(url, body, ctype, ttl):
+    global _cache_bytes
+    if len(body) > CACHE_MAX_BYTES:
+        return
+    with _cache_lock:
+        old = _cache.pop(url, None)
+        if old is not None:
+            _cache_bytes -= len(old[0])
+        _cache[url] = (body, ctype, time.monotonic() + ttl)
+        _cache_bytes += len(body)
+        while len(_cache) > CACHE_MAX or _cache_bytes > CACHE_MAX_BYTES:
+            _, evicted = _cache.popitem(last=False)
+            _cache_bytes -= len(evicted[0])
+
+# (scheme, host, port) -> idle [(conn, idle_since)], most recently used origin and conn last
+_pools = OrderedDict()
+_pools_lock = threading.Lock()
+# honour http_proxy/https_proxy the same way urlopen does by handing those schemes to it
+_env_proxies = urllib.request.getproxies()
+
+def new_connection(key, timeout):
+    scheme, host, port = key
+    cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+    return cls(host, port, timeout=timeout)
+
+def pool_expire_locked(now):
+    # pop idle connections past POOL_IDLE_TIMEOUT and origins over POOL_MAX_ORIGINS;
+    # returns the connections for the caller to close outside the lock
+    dropped = []
+    for key in list(_pools):
+        idle = _pools[key]
+        while idle and now - idle[0][1] > POOL_IDLE_TIMEOUT:
+            dropped.append(idle.pop(0)[0])
+        if not idle:
+            del _pools[key]
+    # origins are in LRU order
+    while len(_pools) > POOL_MAX_ORIGINS:
+        _, idle = _pools.popitem(last=False)
+        dropped.extend(conn for conn, _ in idle)
+    return dropped
+
+def pool_get(key, timeout):
+    # returns (conn, reused)
+    now = time.monotonic()
+    with _pools_lock:
+        dropped = pool_expire_locked(now)
+        # anything left after the sweep is still fresh
+        idle = _pools.get(key)
+        conn = None
+        if idle:
+            conn, _ = idle.pop()
+            _pools.move_to_end(key)
+    for stale in dropped:
+        stale.close()
+    if conn is None:
+        return new_connection(key, timeout), False
+    conn.timeout = timeout
+    if conn.sock is not None:
+        conn.sock.settimeout(timeout)
+    return conn, True
+
+def pool_put(key, conn, resp):
+    # keep conn only if the response was read to the end and the server allows reuse
+    dropped = [conn]
+    if resp.isclosed() and not resp.will_close:
+        with _pools_lock:
+            idle = _pools.setdefault(key, [])
+            _pools.move_to_end(key)
+            if len(idle) < POOL_MAXSIZE:
+                idle.append((conn, time.monotonic()))
+                dropped = []
+            dropped += pool_expire_locked(time.monotonic())
+    for stale in dropped:
+        stale.close()
+
+def pooled_request(key, target, timeout):
+    # returns (conn, resp) for a GET of target on the origin given by key
+    conn, reused = pool_get(key, timeout)
+    while True:
+        try:
+            conn.request('GET', target, headers={'User-Agent': USER_AGENT})
+            return conn, conn.getresponse()
+        except (http.client.RemoteDisconnected, ConnectionError):
+            conn.close()
+            if not reused:
+                raise
+            # the server dropped this idle connection; GET is safe to retry on a fresh one
+            conn, reused = new_connection(key, timeout), False
+        except BaseException:
+            conn.close()
+            raise
+
+@contextlib.contextmanager
+def open_upstream(url, timeout=15):
+    # like urlopen (follows redirects, raises HTTPError/URLError) but reuses
+    # keep-alive connections; the connection goes back to the pool on exit
+    parts = urllib.parse.urlsplit(url)
+    for _ in range(MAX_REDIRECTS + 1):
+        # other schemes, and a redirect onto a proxied scheme, are left to urlopen
+        if parts.scheme not in ('http', 'https') or parts.scheme in _env_proxies:
+            req = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                yield resp
+            return
+        if not parts.hostname:
+            raise urllib.error.URLError('no host given')
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        key = (parts.scheme, parts.hostname, port)
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+        try:
+            conn, resp = pooled_request(key, target, timeout)
+        except OSError as e:
+            raise urllib.error.URLError(e) from e
+        location = resp.getheader('Location')
+        if resp.status in REDIRECT_CODES and location:
+            # drain the (usually tiny) redirect body so the connection can be reused
+            resp.read()
+            pool_put(key, conn, resp)
+            url = urllib.parse.urljoin(url, location)
+            parts = urllib.parse.urlsplit(url)
+            if parts.scheme not in ('http', 'https'):
+                raise urllib.error.HTTPError(url, resp.status, f"redirect to unsupported scheme {parts.scheme!r}",
+                                             resp.headers, None)
+            continue
+        if not 200 <= resp.status < 300:
+            conn.close()
+            raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, None)
+        resp.url = url   # final URL after redirects, as urlopen reports it
+        try:
+            yield resp
+        finally:
+            pool_put(key, conn, resp)
+        return
+    raise urllib.error.HTTPError(url, resp.status, "too many redirects", resp.headers, None)
+
+@contextlib.contextmanager
 def fetch_url(url, timeout=15):
-    req = urllib.request.Request(url, headers={'User-Agent': 'MiniProxy/1.0'})
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        body = resp.read()
+    # yields (body, ctype, body_len) with body a readable file positioned at the start of the body.
+    # A Content-Length above SPOOL_MAX yields the live upstream response so it can be relayed as
+    # it arrives; everything else is buffered in memory or a spooled temp file first.
+    entry = cache_get(url)
+    if entry is not None:
+        body, ctype, _ = entry
+        yield io.BytesIO(body), ctype, len(body)
+        return
+    with open_upstream(url, timeout) as resp:
         ctype = resp.getheader('Content-Type') or 'application/octet-stream'
-        return body, ctype
+        length = getattr(resp, 'length', None)   # None for chunked responses
+        if length is not None and length > SPOOL_MAX:
+            yield resp, ctype, length
+            return
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX)
+        try:
+            shutil.copyfileobj(resp, spool, COPY_BUFSIZE)
+        except BaseException:
+            spool.close()
+            raise
+        # a redirected response belongs to its target; don't pin it under the original URL
+        ttl = cache_ttl(resp) if getattr(resp, 'url', url) == url else None
+    # upstream connection is back in the pool before we start writing to the client
+    with spool:
+        body_len = spool.tell()
+        spool.seek(0)
+        if ttl is not None and ttl > 0 and body_len <= SPOOL_MAX:
+            cache_put(url, spool.read(), ctype, ttl)
+            spool.seek(0)
+        yield spool, ctype, body_len
 
-def handle_client(conn, addr):
+def relay_stream(conn, resp, body_len):
+    # copy body_len bytes from the upstream response to the client through one reusable buffer
+    buf = bytearray(min(body_len, COPY_BUFSIZE))
+    remaining = body_len
+    with memoryview(buf) as mv:
+        while remaining:
+            n = resp.readinto(mv[:min(remaining, len(buf))])
+            if not n:
+                raise RuntimeError(f"upstream closed with {remaining} bytes outstanding")
+            conn.sendall(mv[:n])
+            remaining -= n
+
+def header_buffers(body_len, ctype, version):
+    # response header as a list of buffers, ready for sendmsg_all
+    ctype_enc = str(ctype).encode('utf-8')
+    if version == PROTO_V2:
+        ctype_enc = ctype_enc[:255]
+        return [V2_HEADER.pack(PROTO_V2, body_len, len(ctype_enc)), ctype_enc]
+    length_header = _len_fmt(body_len).encode('ascii')
+    # content type padded/truncated to CTYPE_HEADER; ljust pads in a single C call and is
+    # cheaper than filling a reusable per-thread buffer from Python code
+    if len(ctype_enc) > CTYPE_HEADER:
+        ctype_enc = ctype_enc[:CTYPE_HEADER]
+    return [length_header, ctype_enc.ljust(CTYPE_HEADER, b' ')]
+
+def sendmsg_all(conn, buffers, flags=0):
+    # scatter/gather send: hand all buffers to the kernel in one sendmsg(2),
+    # resuming after partial writes; returns how many sendmsg calls used MSG_ZEROCOPY
+    if not hasattr(conn, 'sendmsg'):
+        # no scatter/gather (e.g. Windows): coalesce small buffers (headers, error bodies) so
+        # they leave in one segment, but sendall large bodies in place rather than copying them
+        small = []
+        for b in buffers:
+            if len(b) < COPY_BUFSIZE:
+                small.append(b)
+                continue
+            if small:
+                conn.sendall(b''.join(small))
+                small = []
+            conn.sendall(b)
+        if small:
+            conn.sendall(b''.join(small))
+        return 0
+    zerocopy_calls = 0
+    views = [memoryview(b).cast('B') for b in buffers if len(b)]
+    while views:
+        try:
+            sent = conn.sendmsg(views, [], flags)
+        except OSError as e:
+            if not flags & MSG_ZEROCOPY or e.errno != errno.ENOBUFS:
+                raise
+            # out of memory for pinned pages; finish with ordinary copies
+            flags &= ~MSG_ZEROCOPY
+            continue
+        if sent == 0:
+            raise RuntimeError("socket connection broken during send")
+        if flags & MSG_ZEROCOPY:
+            zerocopy_calls += 1
+        # drop fully sent buffers and trim the partially sent one
+        while sent and sent >= len(views[0]):
+            sent -= len(views.pop(0))
+        if sent:
+            views[0] = views[0][sent:]
+    return zerocopy_calls
+
+def enable_zerocopy(conn):
+    global _zerocopy_ok
+    if not _zerocopy_ok:
+        return False
     try:
-        conn.settimeout(30)
-        # read until newline
-        data = b''
-        while b'\n' not in data:
-            chunk = conn.recv(RECV_BUFSIZE)
-            if not chunk:
-                # connection closed before newline
-                print(f"[{addr}] connection closed early")
-                return
-            data += chunk
-            if len(data) > 8192:
-                # too long input
+        conn.setsockopt(socket.SOL_SOCKET, SO_ZEROCOPY, 1)
+    except OSError:
+        # kernel without SO_ZEROCOPY (< 4.14); don't try again
+        _zerocopy_ok = False
+        return False
+    return True
+
+def wait_zerocopy(conn, count):
+    # the kernel reads MSG_ZEROCOPY buffers after sendmsg returns; block until it has
+    # reported completion of all count sends on the error queue so the caller may free them
+    # wait for POLLERR only, then read the error queue non-blocking: a recvmsg(MSG_ERRQUEUE) on a
+    # socket with a timeout waits for ordinary readability and spins on EAGAIN once the client
+    # has sent more bytes or half-closed
+    timeout = conn.gettimeout()
+    deadline = time.monotonic() + (timeout or CONN_TIMEOUT)
+    poller = select.poll()
+    poller.register(conn, select.POLLERR)
+    conn.setblocking(False)
+    try:
+        done = 0
+        while done < count:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise socket.timeout('timed out waiting for zerocopy completion')
+            events = poller.poll(remaining * 1000)
+            try:
+                _, ancdata, _, _ = conn.recvmsg(0, socket.CMSG_SPACE(SOCK_EXTENDED_ERR.size), socket.MSG_ERRQUEUE)
+            except BlockingIOError:
+                if any(ev & (select.POLLHUP | select.POLLNVAL) for _, ev in events):
+                    # POLLHUP is always reported, so poll would stop blocking
+                    raise ConnectionResetError(errno.ECONNRESET, 'connection closed before zerocopy completion')
+                continue
+            for _level, _type, data in ancdata:
+                _, origin, _, _, _, _lo, hi = SOCK_EXTENDED_ERR.unpack_from(data)
+                if origin == SO_EE_ORIGIN_ZEROCOPY:
+                    done = max(done, hi + 1)
+    finally:
+        conn.settimeout(timeout)
+
+def read_request_line(conn, timeout):
+    # read up to the first newline (at most MAX_URL_LINE bytes) within an overall deadline, so a
+    # client trickling bytes in can't hold a pool worker for longer than timeout
+    deadline = time.monotonic() + timeout
+    buf = bytearray(MAX_URL_LINE)
+    end = 0
+    with memoryview(buf) as mv:
+        while end < MAX_URL_LINE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise socket.timeout("request line not received in time")
+            conn.settimeout(remaining)
+            got = conn.recv_into(mv[end:])
+            if not got:
                 break
-        url_line = data.split(b'\n', 1)[0].strip()
+            nl = buf.find(b'\n', end, end + got)
+            end += got
+            if nl >= 0:
+                end = nl + 1
+                break
+    return bytes(buf[:end])
+
+def handle_client(conn, addr):
+    try:
+        line = read_request_line(conn, REQUEST_TIMEOUT)
+        conn.settimeout(CONN_TIMEOUT)
+        if not line.endswith(b'\n') and len(line) < MAX_URL_LINE:
+            # connection closed before newline
+            print(f"[{addr}] connection closed early")
+            return
+        version = PROTO_V1
+        if line[:1] == bytes((PROTO_V2,)):
+            version = PROTO_V2
+            line = line[1:]
+        url_line = line.strip()
         try:
             url = url_line.decode('utf-8')
         except UnicodeDecodeError:
-            send_error(conn, "Invalid URL encoding; expected UTF-8.")
+            send_error(conn, "Invalid URL encoding; expected UTF-8.", version)
             return
         if not url:
-            send_error(conn, "No URL received.")
+            send_error(conn, "No URL received.", version)
             return
 
         print(f"[{addr}] Fetching URL: {url}")
 
-        try:
-            body, ctype = fetch_url(url)
-        except urllib.error.HTTPError as e:
-            msg = f"HTTP error {e.code}: {getattr(e, 'reason', '')}"
-            print(f"[{addr}] {msg}")
-            send_error(conn, msg)
-            return
-        except urllib.error.URLError as e:
-            msg = f"URL error: {e.reason}"
-            print(f"[{addr}] {msg}")
-            send_error(conn, msg)
-            return
-        except Exception as e:
-            msg = f"Fetch failed: {e}"
-            print(f"[{addr}] {msg}")
-            send_error(conn, msg)
-            return
+        with contextlib.ExitStack() as stack:
+            try:
+                body, ctype, body_len = stack.enter_context(fetch_url(url))
+            except urllib.error.HTTPError as e:
+                msg = f"HTTP error {e.code}: {getattr(e, 'reason', '')}"
+                print(f"[{addr}] {msg}")
+                send_error(conn, msg, version)
+                return
+            except urllib.error.URLError as e:
+                msg = f"URL error: {e.reason}"
+                print(f"[{addr}] {msg}")
+                send_error(conn, msg, version)
+                return
+            except Exception as e:
+                msg = f"Fetch failed: {e}"
+                print(f"[{addr}] {msg}")
+                send_error(conn, msg, version)
+                return
 
-        # prepare headers
-        body_len = len(body)
-        length_header = f"{body_len:0{LENGTH_HEADER}d}".encode('ascii')
-        # content type padded/truncated to CTYPE_HEADER
-        ctype_enc = str(ctype).encode('utf-8')
-        if len(ctype_enc) > CTYPE_HEADER:
-            ctype_enc = ctype_enc[:CTYPE_HEADER]
-        ctype_enc = ctype_enc.ljust(CTYPE_HEADER, b' ')
-
-        # send headers then body
-        conn.sendall(length_header + ctype_enc)
-        # send body in chunks to avoid huge memory spikes (body already in memory from fetch)
-        offset = 0
-        while offset < body_len:
-            sent = conn.send(body[offset:offset+RECV_BUFSIZE])
-            if sent == 0:
-                raise RuntimeError("socket connection broken during send")
-            offset += sent
+            header = header_buffers(body_len, ctype, version)
+            if body_len <= SPOOL_MAX:
+                # small body in memory: headers and body go out in one sendmsg,
+                # without the user->kernel copy once the body is big enough to pay for page pinning
+                data = body.read()
+                zerocopy = body_len >= ZEROCOPY_MIN and enable_zerocopy(conn)
+                calls = sendmsg_all(conn, header + [data], MSG_ZEROCOPY if zerocopy else 0)
+                if calls:
+                    wait_zerocopy(conn, calls)
+            elif isinstance(body, tempfile.SpooledTemporaryFile):
+                # spooled to disk: let the kernel copy it (socket.sendfile falls back to send() itself)
+                sendmsg_all(conn, header)
+                conn.sendfile(body)
+            else:
+                # live upstream response with a known length: relay it as it arrives
+                sendmsg_all(conn, header)
+                relay_stream(conn, body, body_len)
 
         print(f"[{addr}] Sent {body_len} bytes, Content-Type: {ctype}")
     except socket.timeout:
@@ -104,14 +486,11 @@ def handle_client(conn, addr):
         except Exception:
             pass
 
-def send_error(conn, message):
+def send_error(conn, message, version=PROTO_V1):
     body = message.encode('utf-8')
     ctype = 'text/plain; charset=utf-8'
-    body_len = len(body)
-    length_header = f"{body_len:0{LENGTH_HEADER}d}".encode('ascii')
-    ctype_enc = ctype.encode('utf-8').ljust(CTYPE_HEADER, b' ')
     try:
-        conn.sendall(length_header + ctype_enc + body)
+        sendmsg_all(conn, header_buffers(len(body), ctype, version) + [body])
     except Exception:
         pass
 
@@ -120,17 +499,45 @@ def serve_forever(host=HOST, port=PORT):
     sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     sock.bind((host, port))
     sock.listen(100)
-    print(f"Proxy server listening on {host}:{port}")
+    print(f"Proxy server listening on {host}:{port} ({MAX_WORKERS} workers)")
+    # bounded pool; a free slot is taken before accept(), so excess clients wait in the
+    # kernel listen backlog instead of piling up as open sockets in the executor queue
+    executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    slots = threading.BoundedSemaphore(MAX_WORKERS)
+    # client sockets handed to the executor and not yet finished, so shutdown can wake them
+    active = set()
+    active_lock = threading.Lock()
+
+    def finished(conn):
+        with active_lock:
+            active.discard(conn)
+        slots.release()
+
     try:
         while True:
+            slots.acquire()
             conn, addr = sock.accept()
             print(f"Connection from {addr}")
-            t = threading.Thread(target=handle_client, args=(conn, addr), daemon=True)
-            t.start()
+            # headers are a small write; don't let Nagle hold them back
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with active_lock:
+                active.add(conn)
+            future = executor.submit(handle_client, conn, addr)
+            future.add_done_callback(lambda _, conn=conn: finished(conn))
     except KeyboardInterrupt:
         print("Shutting down server...")
     finally:
         sock.close()
+        # pool threads aren't daemons and are joined at exit; shut their client sockets down so
+        # blocked reads/writes (and handlers still queued) fail fast instead of running to completion
+        with active_lock:
+            pending = list(active)
+        for conn in pending:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        executor.shutdown(wait=False)
 
 if __name__ == '__main__':
     if len(sys.argv) >= 2: